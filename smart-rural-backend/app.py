@@ -1,7 +1,9 @@
+import os
 from flask import Flask
 from flask_cors import CORS
 from routes.sitios import sitios_bp
 from routes.resenas import resenas_bp
+from routes.stream import stream_bp
 
 app = Flask(__name__)
 CORS(app)
@@ -9,11 +11,17 @@ CORS(app)
 # Registrar los endpoints
 app.register_blueprint(sitios_bp)
 app.register_blueprint(resenas_bp)
+app.register_blueprint(stream_bp)
+
+# Con varios workers/procesos, propagar reseñas nuevas vía change streams de MongoDB
+# (el hilo se inicia con la primera conexión a /stream, ver routes/stream.py)
+app.config["CHANGE_STREAMS"] = os.environ.get("SMARTRURAL_CHANGE_STREAMS") == "1"
 
 @app.route('/')
 def index():
     return {"mensaje": "API Smart Rural activa"}
 
 if __name__ == '__main__':
+    # Cada conexión SSE ocupa un hilo: el servidor debe ser multihilo (o gevent)
     app.run(host='0.0.0.0', port=5000, debug=True)
 
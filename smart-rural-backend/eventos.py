@@ -0,0 +1,311 @@
+"""
+Bus publish/subscribe en memoria para notificar reseñas nuevas por sitio.
+- crear_resena publica cada reseña; los suscriptores (conexiones SSE de
+    /stream/sitios/<sitio_id>) la reciben junto con los contadores actualizados.
+- Los contadores se calculan una vez al suscribirse y luego se incrementan,
+    sin volver a ejecutar el análisis completo de /resumen. Las reseñas que llegan
+    mientras se hace el conteo inicial se guardan y se concilian por _id.
+- Cada suscriptor tiene una cola acotada: si un cliente lento la llena se le
+    desconecta (backpressure) y debe recargar. Hay un tope de conexiones por worker.
+- Opcionalmente, un hilo escucha los change streams de MongoDB para propagar
+    reseñas insertadas por otros workers/procesos (requiere replica set, p. ej. Atlas).
+
+Cada conexión SSE ocupa un hilo del worker mientras está abierta, así que el
+tope MAX_CONEXIONES supone un servidor con hilos o gevent (p. ej. el servidor
+de desarrollo de Flask, o gunicorn con --threads / -k gevent).
+"""
+import json
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+
+from bson import ObjectId
+from pymongo.errors import OperationFailure, PyMongoError
+from werkzeug.http import http_date
+
+from db import resenas_collection
+from models import resena_to_dict
+
+logger = logging.getLogger(__name__)
+
+MAX_CONEXIONES = 50        # suscriptores simultáneos por worker
+MAX_PENDIENTES = 100       # eventos en cola por suscriptor antes de desconectarlo
+HEARTBEAT_SEGUNDOS = 15    # intervalo de comentarios keep-alive
+MAX_VISTAS = 200           # _id recientes recordados por sitio para no contar dos veces
+# Reseñas con _id anterior a (inicio del conteo - margen) se asumen ya contadas
+MARGEN_CONTEO = timedelta(minutes=10)
+
+SENTIMIENTOS = ("positivo", "neutral", "negativo")
+
+FIN = None  # marca de cierre en la cola de un suscriptor
+
+
+def _json_default(v):
+    """Mismo formato de fechas que jsonify."""
+    if isinstance(v, datetime):
+        return http_date(v)
+    return str(v)
+
+
+def _porcentajes(contadores):
+    total = contadores["total"]
+    if total == 0:
+        return {s: 0 for s in SENTIMIENTOS}
+    return {s: round((contadores[s] / total) * 100, 2) for s in SENTIMIENTOS}
+
+
+def _sumar(contadores, resena):
+    sentimiento = resena.get("sentimiento")
+    contadores[sentimiento if sentimiento in SENTIMIENTOS else "neutral"] += 1
+    contadores["total"] += 1
+
+
+def _contar_resenas(sitio_oid, umbral):
+    """
+    Conteo inicial por sentimiento, junto con los _id >= umbral que entraron en
+    ese mismo conteo (ambas facetas recorren los mismos documentos).
+    """
+    contadores = {"total": 0, "positivo": 0, "neutral": 0, "negativo": 0}
+    pipeline = [
+        {"$match": {"sitio_id": sitio_oid}},
+        {"$facet": {
+            "conteo": [{"$group": {"_id": "$sentimiento", "n": {"$sum": 1}}}],
+            "recientes": [{"$match": {"_id": {"$gte": umbral}}}, {"$project": {"_id": 1}}],
+        }},
+    ]
+    res = next(iter(resenas_collection.aggregate(pipeline)), {})
+    for fila in res.get("conteo", []):
+        clave = fila["_id"] if fila["_id"] in SENTIMIENTOS else "neutral"
+        contadores[clave] += fila["n"]
+        contadores["total"] += fila["n"]
+    recientes = {d["_id"] for d in res.get("recientes", [])}
+    return contadores, recientes
+
+
+def _evento_contadores(contadores):
+    return formatear_evento("contadores", {
+        "contadores": dict(contadores),
+        "porcentajes": _porcentajes(contadores),
+    })
+
+
+def _evento_resena(resena, contadores):
+    return formatear_evento("resena", {
+        "resena": resena_to_dict(resena),
+        "contadores": dict(contadores),
+        "porcentajes": _porcentajes(contadores),
+    })
+
+
+class Suscripcion:
+    """Cola acotada de eventos SSE ya formateados para un cliente."""
+
+    def __init__(self, sitio_id):
+        self.sitio_id = sitio_id
+        self.cola = queue.Queue(maxsize=MAX_PENDIENTES)
+        self.desbordada = False
+
+    def entregar(self, evento):
+        try:
+            self.cola.put_nowait(evento)
+        except queue.Full:
+            self.desbordada = True
+
+
+class _EstadoSitio:
+    """Suscriptores y contadores de un sitio; contadores=None mientras se cuenta."""
+
+    def __init__(self):
+        self.suscriptores = set()
+        self.contadores = None
+        self.pendientes = []                  # reseñas publicadas durante el conteo
+        self.vistas = deque(maxlen=MAX_VISTAS)
+
+
+class BusResenas:
+    """Registro de suscriptores por sitio y contadores en caché."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sitios = {}         # sitio_id -> _EstadoSitio
+        self._conexiones = 0
+        self.puente_activo = False
+
+    def suscribir(self, sitio_id):
+        """
+        Registra un suscriptor y devuelve su Suscripcion, o None si se alcanzó el
+        tope. El primer evento de la cola son los contadores del sitio.
+        """
+        with self._lock:
+            if self._conexiones >= MAX_CONEXIONES:
+                return None
+            self._conexiones += 1
+            sub = Suscripcion(sitio_id)
+            estado = self._sitios.get(sitio_id)
+            inicializar = estado is None
+            if inicializar:
+                # Se registra antes de contar para que publicar() guarde lo que llegue
+                estado = self._sitios[sitio_id] = _EstadoSitio()
+            estado.suscriptores.add(sub)
+            if estado.contadores is not None:
+                sub.entregar(_evento_contadores(estado.contadores))
+
+        if inicializar:
+            self._inicializar(sitio_id, estado)
+        return sub
+
+    def _inicializar(self, sitio_id, estado):
+        """Cuenta las reseñas del sitio (fuera del lock) y concilia las pendientes."""
+        umbral = ObjectId.from_datetime(datetime.now(timezone.utc) - MARGEN_CONTEO)
+        try:
+            contadores, recientes = _contar_resenas(ObjectId(sitio_id), umbral)
+        except Exception:
+            logger.exception("No se pudo contar las reseñas del sitio %s", sitio_id)
+            with self._lock:
+                if self._sitios.get(sitio_id) is estado:
+                    del self._sitios[sitio_id]
+                subs = list(estado.suscriptores)
+                estado.suscriptores.clear()
+                self._conexiones -= len(subs)
+                error = formatear_evento("error", {"mensaje": "No se pudo cargar el sitio."})
+                for sub in subs:
+                    sub.entregar(error)
+                    sub.entregar(FIN)
+            return
+
+        with self._lock:
+            if self._sitios.get(sitio_id) is not estado:
+                return  # todos los suscriptores se fueron durante el conteo
+            nuevas = []
+            for resena in estado.pendientes:
+                rid = resena["_id"]
+                if rid in estado.vistas:
+                    continue
+                estado.vistas.append(rid)
+                nuevas.append(resena)
+                if rid not in recientes and rid >= umbral:
+                    _sumar(contadores, resena)  # insertada después del conteo
+            estado.pendientes = []
+            estado.contadores = contadores
+
+            # Entregas bajo el lock para respetar el orden frente a publicar()
+            eventos = [_evento_contadores(contadores)]
+            eventos += [_evento_resena(r, contadores) for r in nuevas]
+            for sub in estado.suscriptores:
+                for evento in eventos:
+                    sub.entregar(evento)
+
+    def desuscribir(self, sub):
+        """Libera la conexión de un suscriptor; es idempotente."""
+        with self._lock:
+            estado = self._sitios.get(sub.sitio_id)
+            if estado is None or sub not in estado.suscriptores:
+                return
+            estado.suscriptores.discard(sub)
+            self._conexiones -= 1
+            if not estado.suscriptores:
+                # Sin oyentes no se mantiene el conteo (podría quedar desfasado)
+                del self._sitios[sub.sitio_id]
+
+    def publicar(self, resena):
+        """Difunde una reseña (documento de Mongo) a los suscriptores de su sitio."""
+        sitio_id = str(resena["sitio_id"])
+        with self._lock:
+            estado = self._sitios.get(sitio_id)
+            if estado is None:
+                return
+            if estado.contadores is None:
+                estado.pendientes.append(resena)
+                return
+            if resena["_id"] in estado.vistas:
+                return  # ya publicada (p. ej. local y por el puente de Mongo)
+            estado.vistas.append(resena["_id"])
+            _sumar(estado.contadores, resena)
+            evento = _evento_resena(resena, estado.contadores)
+            for sub in estado.suscriptores:
+                sub.entregar(evento)
+
+    def publicar_local(self, resena):
+        """Usado por crear_resena; con el puente activo la publicación llega por Mongo."""
+        if not self.puente_activo:
+            self.publicar(resena)
+
+    def conexiones(self):
+        with self._lock:
+            return self._conexiones
+
+
+def formatear_evento(nombre, datos):
+    """Serializa un evento con el formato de text/event-stream."""
+    cuerpo = json.dumps(datos, default=_json_default, ensure_ascii=False)
+    return f"event: {nombre}\ndata: {cuerpo}\n\n"
+
+
+def flujo_eventos(sub):
+    """Generador SSE: contadores iniciales, reseñas nuevas y heartbeats."""
+    try:
+        yield "retry: 5000\n\n"
+        while True:
+            if sub.desbordada:
+                # Cliente demasiado lento: se le pide recargar en lugar de acumular eventos
+                yield formatear_evento("desbordado", {"mensaje": "Recarga las reseñas."})
+                return
+            try:
+                evento = sub.cola.get(timeout=HEARTBEAT_SEGUNDOS)
+            except queue.Empty:
+                yield ": ping\n\n"
+                continue
+            if evento is FIN:
+                return
+            yield evento
+    finally:
+        bus.desuscribir(sub)
+
+
+_puente_lock = threading.Lock()
+_puente_hilo = None
+
+
+def _escuchar_cambios():
+    pipeline = [{"$match": {"operationType": "insert"}}]
+    token = None
+    while True:
+        try:
+            with resenas_collection.watch(pipeline, resume_after=token) as stream:
+                # Solo con el stream abierto se delega la publicación al puente
+                bus.puente_activo = True
+                for cambio in stream:
+                    token = stream.resume_token
+                    bus.publicar(cambio["fullDocument"])
+        except OperationFailure:
+            if token is not None:
+                logger.warning("No se pudo reanudar el change stream; se reinicia sin token",
+                               exc_info=True)
+                token = None
+            else:
+                logger.exception("Change stream de reseñas no disponible")
+        except PyMongoError:
+            logger.exception("Change stream de reseñas interrumpido")
+        finally:
+            bus.puente_activo = False
+        time.sleep(5)
+
+
+def iniciar_puente_mongo():
+    """
+    Escucha inserciones en 'resenas' vía change streams y las publica en el bus.
+    Se puede llamar varias veces: el hilo se inicia una sola vez por proceso.
+    """
+    global _puente_hilo
+    with _puente_lock:
+        if _puente_hilo is None:
+            _puente_hilo = threading.Thread(target=_escuchar_cambios,
+                                            name="puente-resenas", daemon=True)
+            _puente_hilo.start()
+        return _puente_hilo
+
+
+bus = BusResenas()
@@ -0,0 +1,52 @@
+"""
+Utilidades de respuesta compartidas por los endpoints:
+- Sparse fieldsets: '?fields=a,b,c' limita la respuesta a los campos pedidos
+    (y permite a cada endpoint omitir el cálculo de lo que no se pide).
+- Negociación de contenido: JSON por defecto; MessagePack si el cliente envía
+    'Accept: application/msgpack' y el paquete msgpack está instalado
+    (dependencia opcional, incluida en requirements.txt).
+"""
+from flask import request, jsonify, current_app
+
+try:
+    import msgpack  # opcional: sin él se responde siempre en JSON
+except ImportError:
+    msgpack = None
+
+MIMETYPES_MSGPACK = ("application/msgpack", "application/x-msgpack")
+
+
+def campos_solicitados():
+    """Devuelve el set de campos de '?fields=' o None si no se pidió filtro."""
+    raw = request.args.get("fields")
+    if raw is None:
+        return None
+    campos = {c.strip() for c in raw.split(",") if c.strip()}
+    return campos or None
+
+
+def filtrar_campos(datos, campos, siempre=()):
+    """Deja solo las claves pedidas (más las de 'siempre'); None = sin filtro."""
+    if campos is None:
+        return datos
+    return {k: v for k, v in datos.items() if k in campos or k in siempre}
+
+
+def _prefiere_msgpack():
+    """True si el Accept del cliente prefiere MessagePack sobre JSON."""
+    if msgpack is None:
+        return False
+    mejor = request.accept_mimetypes.best_match(("application/json",) + MIMETYPES_MSGPACK)
+    return mejor in MIMETYPES_MSGPACK
+
+
+def responder(datos):
+    """Serializa 'datos' en JSON o MessagePack según la cabecera Accept."""
+    if _prefiere_msgpack():
+        # Mismo 'default' que jsonify (fechas, etc.) para que ambos formatos coincidan
+        cuerpo = msgpack.packb(datos, default=current_app.json.default, use_bin_type=True)
+        resp = current_app.response_class(cuerpo, mimetype="application/msgpack")
+    else:
+        resp = jsonify(datos)
+    resp.vary.add("Accept")
+    return resp
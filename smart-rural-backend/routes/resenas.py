@@ -3,8 +3,9 @@ Este endpoint usa PLN (TextBlob) para analizar el sentimiento de cada reseña.
 También calcula un resumen y recomienda en base a sentimientos y accesibilidad.
 Además infiere: rango de edad, accesibilidad para discapacidad, meses
 recomendados, confianza de datos, tendencia mensual, tags, alertas y consejos.
+Con '?fields=' solo se calculan y devuelven los campos pedidos.
 """
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request
 from db import resenas_collection
 from models import resena_to_dict
 from bson import ObjectId
@@ -13,6 +14,8 @@ from datetime import datetime, timedelta
 from utils import analizar_sentimiento, generar_recomendacion_inteligente
 from utils import estimar_accesibilidad
 from db import sitios_collection
+from respuestas import campos_solicitados, filtrar_campos, responder
+from eventos import bus
 
 # ------------------- Helpers locales (rutas no cambian) -------------------
 
@@ -262,7 +265,8 @@ def crear_resena():
 
     resultado = resenas_collection.insert_one(resena)
     resena["_id"] = resultado.inserted_id
-    return jsonify(resena_to_dict(resena)), 201
+    bus.publicar_local(resena)  # notifica a los clientes SSE del sitio
+    return responder(resena_to_dict(resena)), 201
 
 
 @resenas_bp.route('/resenas/<sitio_id>', methods=['GET'])
@@ -270,19 +274,25 @@ def obtener_resenas_por_sitio(sitio_id):
     try:
         oid = ObjectId(sitio_id)
     except Exception:
-        return jsonify([]), 200
+        return responder([]), 200
     resenas = list(resenas_collection.find({"sitio_id": oid}))
     resenas_dict = [resena_to_dict(r) for r in resenas]
-    return jsonify(resenas_dict), 200
+    return responder(resenas_dict), 200
 
 
 @resenas_bp.route('/resumen/<sitio_id>', methods=['GET'])
 def resumen_resenas(sitio_id):
+    # Sparse fieldsets: None = todos los campos
+    campos = campos_solicitados()
+
+    def quiere(*nombres):
+        return campos is None or any(n in campos for n in nombres)
+
     # Carga segura de reseñas
     try:
         filtro = {"sitio_id": ObjectId(sitio_id)}
     except Exception:
-        return jsonify({
+        return responder(filtrar_campos({
             "total": 0, "porcentajes": {"positivo": 0, "neutral": 0, "negativo": 0},
             "conclusion": "ID de sitio no válido.",
             "recomendacion": "Verifica el identificador del sitio.",
@@ -291,13 +301,13 @@ def resumen_resenas(sitio_id):
             "mejores_meses": [], "detalle_meses": [],
             "confianza": {"nivel":"baja","n_total":0,"n_ultimos_90d":0},
             "tendencia": [], "tags": [], "alertas": [], "consejos": []
-        }), 200
+        }, campos)), 200
 
     resenas = list(resenas_collection.find(filtro))
     total = len(resenas)
 
     if total == 0:
-        return jsonify({
+        return responder(filtrar_campos({
             "total": 0,
             "porcentajes": {"positivo": 0, "neutral": 0, "negativo": 0},
             "conclusion": "Este sitio aún no tiene reseñas.",
@@ -309,7 +319,7 @@ def resumen_resenas(sitio_id):
             "detalle_meses": [],
             "confianza": {"nivel":"baja","n_total":0,"n_ultimos_90d":0},
             "tendencia": [], "tags": [], "alertas": [], "consejos": []
-        }), 200
+        }, campos)), 200
 
     # Conteo de sentimientos
     sentimientos = [(r.get('sentimiento') or 'neutral') for r in resenas]
@@ -320,57 +330,59 @@ def resumen_resenas(sitio_id):
         "negativo": round((conteo.get("negativo", 0) / total) * 100, 2)
     }
 
-    # Estado de vía
-    sitio = sitios_collection.find_one({"_id": ObjectId(sitio_id)})
-    estado_via = (sitio or {}).get("estado_via", "regular")
+    resumen = {"total": total, "porcentajes": porcentajes}
+
+    # Accesibilidad (normalizada a 0..1) + texto; también alimenta recomendación y discapacidad
+    if quiere("accesibilidad", "accesibilidad_texto", "recomendacion", "discapacidad", "consejos"):
+        # Estado de vía
+        sitio = sitios_collection.find_one({"_id": ObjectId(sitio_id)})
+        estado_via = (sitio or {}).get("estado_via", "regular")
 
-    # Accesibilidad (normalizada a 0..1) + texto + explicación
-    opiniones_positivas_valor = porcentajes["positivo"] / 100.0
-    acc_val = _to_float01(estimAR := estimar_accesibilidad(estado_via, opiniones_positivas_valor))
-    acc_txt = _acc_texto(acc_val)
+        opiniones_positivas_valor = porcentajes["positivo"] / 100.0
+        acc_val = _to_float01(estimar_accesibilidad(estado_via, opiniones_positivas_valor))
+        resumen["accesibilidad"] = acc_val                      # num 0..1 (para UI)
+        resumen["accesibilidad_texto"] = _acc_texto(acc_val)    # opcional (comodín)
 
     # Heurísticas adicionales
     textos = [(r.get("texto") or "") for r in resenas]
-    edad_sugerida = _inferir_edad(textos)
-    discapacidad = _inferir_discapacidad(textos, acc_val)
-    meses_info = _mejores_meses(resenas)
+    if quiere("edad_sugerida"):
+        resumen["edad_sugerida"] = _inferir_edad(textos)
+    if quiere("discapacidad", "consejos"):
+        resumen["discapacidad"] = _inferir_discapacidad(textos, acc_val)
+    if quiere("mejores_meses", "detalle_meses", "consejos"):
+        meses_info = _mejores_meses(resenas)
+        resumen["mejores_meses"] = meses_info["mejores_meses"]
+        resumen["detalle_meses"] = meses_info["detalle_meses"]
 
     # Datos extendidos
-    tendencia = _tendencia_12m(resenas)
-    confianza = _confianza(resenas)
-    tags = _tags(textos)
-    alertas = _alertas(textos)
-    consejos = _consejos(tags, discapacidad, meses_info["mejores_meses"])
+    if quiere("tendencia"):
+        resumen["tendencia"] = _tendencia_12m(resenas)
+    if quiere("confianza"):
+        resumen["confianza"] = _confianza(resenas)
+    if quiere("tags", "consejos"):
+        resumen["tags"] = _tags(textos)
+    if quiere("alertas"):
+        resumen["alertas"] = _alertas(textos)
+    if quiere("consejos"):
+        resumen["consejos"] = _consejos(resumen["tags"], resumen["discapacidad"], resumen["mejores_meses"])
 
     # Recomendación AI-like
-    recomendacion = generar_recomendacion_inteligente(porcentajes, acc_val, total)
-    
+    if quiere("recomendacion"):
+        resumen["recomendacion"] = generar_recomendacion_inteligente(porcentajes, acc_val, total)
+
     # Conclusión
-    if porcentajes["positivo"] >= 70:
-        conclusion = "🔵 Altamente recomendado - Excelentes opiniones de visitantes"
-    elif porcentajes["positivo"] >= 50:
-        conclusion = "🟢 Recomendado - Buenas experiencias reportadas"
-    elif porcentajes["negativo"] >= 60:
-        conclusion = "🔴 No recomendado - Múltiples experiencias negativas"
-    elif porcentajes["negativo"] >= 40:
-        conclusion = "🟡 Visitar con precaución - Experiencias mixtas con tendencia negativa"
-    else:
-        conclusion = "🟡 Recomendado con reservas - Opiniones variadas"
-
-    return jsonify({
-        "total": total,
-        "porcentajes": porcentajes,
-        "conclusion": conclusion,
-        "recomendacion": recomendacion,
-        "accesibilidad": acc_val,                 # num 0..1 (para UI)
-        "accesibilidad_texto": acc_txt,           # opcional (comodín)
-        "edad_sugerida": edad_sugerida,
-        "discapacidad": discapacidad,
-        "mejores_meses": meses_info["mejores_meses"],
-        "detalle_meses": meses_info["detalle_meses"],
-        "tendencia": tendencia,
-        "confianza": confianza,
-        "tags": tags,
-        "alertas": alertas,
-        "consejos": consejos
-    }), 200
+    if quiere("conclusion"):
+        if porcentajes["positivo"] >= 70:
+            conclusion = "🔵 Altamente recomendado - Excelentes opiniones de visitantes"
+        elif porcentajes["positivo"] >= 50:
+            conclusion = "🟢 Recomendado - Buenas experiencias reportadas"
+        elif porcentajes["negativo"] >= 60:
+            conclusion = "🔴 No recomendado - Múltiples experiencias negativas"
+        elif porcentajes["negativo"] >= 40:
+            conclusion = "🟡 Visitar con precaución - Experiencias mixtas con tendencia negativa"
+        else:
+            conclusion = "🟡 Recomendado con reservas - Opiniones variadas"
+        resumen["conclusion"] = conclusion
+
+    # Los campos auxiliares (p. ej. tags para consejos) se recortan al final
+    return responder(filtrar_campos(resumen, campos)), 200
@@ -2,20 +2,28 @@
 Aquí se aplica lógica difusa (ver utils.py)
 para estimar el nivel de accesibilidad combinando estado de vía y sentimiento de reseñas.
 """
-from flask import Blueprint, jsonify
+from flask import Blueprint
 from db import sitios_collection, resenas_collection
 from models import sitio_to_dict
 from utils import estimar_accesibilidad
+from respuestas import campos_solicitados, filtrar_campos, responder
 
 sitios_bp = Blueprint('sitios', __name__)
 
 @sitios_bp.route('/sitios', methods=['GET'])
 def obtener_sitios():
+    # ?fields=nombre,lat,lon -> solo esos campos (el _id se incluye siempre)
+    campos = campos_solicitados()
     sitios = list(sitios_collection.find())
     sitios_con_accesibilidad = []
 
     for sitio in sitios:
-        sitio_dict = sitio_to_dict(sitio)
+        sitio_dict = filtrar_campos(sitio_to_dict(sitio), campos, siempre=("_id",))
+
+        # Sin 'accesibilidad' en los campos no hace falta consultar reseñas
+        if campos is not None and "accesibilidad" not in campos:
+            sitios_con_accesibilidad.append(sitio_dict)
+            continue
 
         # Obtener reseñas del sitio
         resenas = list(resenas_collection.find({"sitio_id": sitio["_id"]}))
@@ -29,4 +37,4 @@ def obtener_sitios():
         sitio_dict["accesibilidad"] = accesibilidad
         sitios_con_accesibilidad.append(sitio_dict)
 
-    return jsonify(sitios_con_accesibilidad)
+    return responder(sitios_con_accesibilidad)
@@ -0,0 +1,40 @@
+"""
+Server-Sent Events: /stream/sitios/<sitio_id> envía las reseñas nuevas de un
+sitio y sus contadores de sentimiento a medida que llegan (ver eventos.py),
+evitando que los clientes re-consulten /resenas y /resumen periódicamente.
+"""
+from flask import Blueprint, Response, current_app, jsonify, request
+from bson import ObjectId
+from eventos import bus, flujo_eventos, iniciar_puente_mongo
+
+stream_bp = Blueprint('stream', __name__)
+
+CABECERAS_SSE = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",  # evita buffering en proxies tipo nginx
+}
+
+@stream_bp.route('/stream/sitios/<sitio_id>', methods=['GET', 'HEAD'])
+def stream_sitio(sitio_id):
+    if not ObjectId.is_valid(sitio_id):
+        return jsonify({"error": "ID de sitio no válido."}), 400
+
+    # HEAD no lee el cuerpo: se responde sin ocupar una conexión del bus
+    if request.method == 'HEAD':
+        return Response(mimetype="text/event-stream", headers=CABECERAS_SSE)
+
+    # El puente se arranca aquí (y no al importar app.py) para que solo corra
+    # en el proceso que atiende peticiones, no en el padre del reloader
+    if current_app.config.get("CHANGE_STREAMS"):
+        iniciar_puente_mongo()
+
+    sub = bus.suscribir(sitio_id)
+    if sub is None:
+        resp = jsonify({"error": "Demasiadas conexiones en vivo, intenta más tarde."})
+        resp.headers["Retry-After"] = "30"
+        return resp, 503
+
+    resp = Response(flujo_eventos(sub), mimetype="text/event-stream", headers=CABECERAS_SSE)
+    # Si el cuerpo nunca se itera, el finally del generador no corre: liberar igual
+    resp.call_on_close(lambda: bus.desuscribir(sub))
+    return resp
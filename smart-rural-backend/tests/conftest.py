@@ -0,0 +1,12 @@
+import os
+import sys
+import types
+from unittest.mock import MagicMock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# db.py conecta a MongoDB Atlas al importarse: se sustituye por colecciones simuladas
+_db = types.ModuleType("db")
+_db.resenas_collection = MagicMock()
+_db.sitios_collection = MagicMock()
+sys.modules.setdefault("db", _db)
@@ -0,0 +1,160 @@
+from datetime import datetime
+from unittest.mock import MagicMock
+
+import pytest
+from bson import ObjectId
+from flask import Flask
+
+import eventos
+from routes import stream
+
+SITIO = str(ObjectId())
+
+
+def _facet(conteo=(), recientes=()):
+    return [{
+        "conteo": [{"_id": s, "n": n} for s, n in conteo],
+        "recientes": [{"_id": rid} for rid in recientes],
+    }]
+
+
+def _resena(sentimiento="positivo", _id=None):
+    return {
+        "_id": _id or ObjectId(),
+        "sitio_id": ObjectId(SITIO),
+        "usuario": "Ana",
+        "texto": "Muy bonito",
+        "fecha": datetime(2025, 1, 1),
+        "sentimiento": sentimiento,
+    }
+
+
+def _eventos(sub):
+    out = []
+    while not sub.cola.empty():
+        out.append(sub.cola.get_nowait())
+    return out
+
+
+@pytest.fixture
+def bus(monkeypatch):
+    nuevo = eventos.BusResenas()
+    coleccion = MagicMock()
+    coleccion.aggregate.return_value = _facet([("positivo", 2), ("negativo", 1)])
+    monkeypatch.setattr(eventos, "bus", nuevo)
+    monkeypatch.setattr(stream, "bus", nuevo)
+    monkeypatch.setattr(eventos, "resenas_collection", coleccion)
+    nuevo.coleccion = coleccion
+    return nuevo
+
+
+@pytest.fixture
+def cliente(bus):
+    app = Flask(__name__)
+    app.register_blueprint(stream.stream_bp)
+    return app.test_client()
+
+
+def test_suscribir_respeta_tope_y_desuscribir_es_idempotente(bus, monkeypatch):
+    monkeypatch.setattr(eventos, "MAX_CONEXIONES", 2)
+    a = bus.suscribir(SITIO)
+    b = bus.suscribir(SITIO)
+    assert bus.suscribir(SITIO) is None
+    assert bus.conexiones() == 2
+
+    bus.desuscribir(a)
+    bus.desuscribir(a)
+    assert bus.conexiones() == 1
+    bus.desuscribir(b)
+    assert bus.conexiones() == 0
+    # El conteo se hizo una sola vez para ambos suscriptores
+    assert bus.coleccion.aggregate.call_count == 1
+
+
+def test_head_no_ocupa_conexion(bus, cliente):
+    resp = cliente.head(f"/stream/sitios/{SITIO}")
+    assert resp.status_code == 200
+    assert resp.mimetype == "text/event-stream"
+    assert bus.conexiones() == 0
+
+
+def test_cuerpo_no_leido_libera_conexion(bus, cliente):
+    resp = cliente.get(f"/stream/sitios/{SITIO}", buffered=False)
+    assert bus.conexiones() == 1
+    resp.close()
+    assert bus.conexiones() == 0
+
+
+def test_tope_devuelve_503(bus, cliente, monkeypatch):
+    monkeypatch.setattr(eventos, "MAX_CONEXIONES", 0)
+    resp = cliente.get(f"/stream/sitios/{SITIO}")
+    assert resp.status_code == 503
+    assert resp.headers["Retry-After"] == "30"
+
+
+def test_desbordamiento_envia_evento_y_libera(bus, monkeypatch):
+    monkeypatch.setattr(eventos, "MAX_PENDIENTES", 3)
+    sub = bus.suscribir(SITIO)  # 1 evento en cola (contadores)
+    for _ in range(3):
+        bus.publicar(_resena())
+    assert sub.desbordada
+
+    flujo = eventos.flujo_eventos(sub)
+    assert next(flujo).startswith("retry:")
+    assert next(flujo).startswith("event: desbordado")
+    with pytest.raises(StopIteration):
+        next(flujo)
+    assert bus.conexiones() == 0
+
+
+def test_publicar_actualiza_contadores(bus):
+    sub = bus.suscribir(SITIO)
+    bus.publicar(_resena("positivo"))
+    bus.publicar(_resena("negativo"))
+
+    inicial, r1, r2 = _eventos(sub)
+    assert '"total": 3' in inicial
+    assert r1.startswith("event: resena")
+    assert '"total": 4' in r1 and '"positivo": 3' in r1
+    assert '"total": 5' in r2 and '"negativo": 2' in r2
+    assert '"porcentajes": {"positivo": 60.0, "neutral": 0.0, "negativo": 40.0}' in r2
+
+
+def test_publicar_ignora_duplicados(bus):
+    sub = bus.suscribir(SITIO)
+    resena = _resena()
+    bus.publicar(resena)
+    bus.publicar(resena)
+    assert len(_eventos(sub)) == 2
+
+
+def test_publicar_durante_conteo_se_concilia_por_id(bus):
+    ya_contada = _resena("positivo")
+    posterior = _resena("negativo")
+
+    def contar(_pipeline):
+        # Llegan dos reseñas mientras corre la agregación; solo la primera
+        # forma parte del conteo devuelto
+        bus.publicar(ya_contada)
+        bus.publicar(posterior)
+        return _facet([("positivo", 3)], [ya_contada["_id"]])
+
+    bus.coleccion.aggregate.side_effect = contar
+    sub = bus.suscribir(SITIO)
+
+    inicial, e1, e2 = _eventos(sub)
+    assert '"total": 4' in inicial and '"negativo": 1' in inicial
+    assert str(ya_contada["_id"]) in e1 and '"total": 4' in e1
+    assert str(posterior["_id"]) in e2
+
+
+def test_error_en_conteo_libera_conexion(bus):
+    bus.coleccion.aggregate.side_effect = RuntimeError("sin conexión")
+    sub = bus.suscribir(SITIO)
+    assert bus.conexiones() == 0
+
+    flujo = eventos.flujo_eventos(sub)
+    next(flujo)
+    assert next(flujo).startswith("event: error")
+    with pytest.raises(StopIteration):
+        next(flujo)